@@ -1,33 +1,45 @@
 """Module handling file/database input/output and querying."""
+import atexit
+import contextlib
 import datetime as dt
+import functools
 import json
 import pathlib
 import re
 import sqlite3
+import threading
 import time
 from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Iterator
 
 import get
 
+# Uses the faster orjson parser if available.
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
 
-@dataclass
+
+@dataclass(slots=True)
 class DownloadSettings:
     """Download location IDs and refresh rate."""
     location_ids: list[int]
     refresh_seconds: int | float
 
 
-@dataclass
+@dataclass(slots=True)
 class EmailInfo:
     """Sender email, recipient emails, location ID and times to send at."""
     sender: str
     password: str
     recipients: list[str]
     location_id: int
-    times: list[dt.time]
+    times: frozenset[dt.time]
 
 
-@dataclass
+@dataclass(slots=True)
 class LocationInfo:
     """Overall location details, including last updated date/time."""
     name: str
@@ -37,7 +49,7 @@ class LocationInfo:
     last_updated: str | None
 
 
-@dataclass
+@dataclass(slots=True)
 class WeatherInfo:
     """Hourly weather information."""
     date_time: dt.datetime
@@ -52,7 +64,7 @@ class WeatherInfo:
     weather_type: str
 
 
-@dataclass
+@dataclass(slots=True)
 class ConditionsInfo:
     """Daily conditions information."""
     date: dt.date
@@ -65,7 +77,7 @@ class ConditionsInfo:
     pollen: int | None
 
 
-@dataclass
+@dataclass(slots=True)
 class WarningInfo:
     """Weather warning information."""
     level: str
@@ -88,45 +100,278 @@ LOCATION_TABLE = "locations"
 TIME_TABLE = "weather_times"
 DAY_TABLE = "daily_conditions"
 WARNING_TABLE = "warnings"
+# Order of the values in records inserted into each table.
+TABLE_COLUMNS = {
+    TIME_TABLE: (
+        "location_id", "timestamp", "time_zone_offset", "temperature",
+        "feels_like_temperature", "wind_speed", "wind_direction", "humidity",
+        "precipitation_odds", "pressure", "visibility", "weather_type"),
+    DAY_TABLE: (
+        "location_id", "timestamp", "time_zone_offset", "max_temperature",
+        "min_temperature", "sunrise", "sunset", "uv", "pollution", "pollen"),
+    WARNING_TABLE: (
+        "location_id", "level", "weather_type", "issued", "start", "end",
+        "time_zone_offset", "description")
+}
+# Sets the last updated date/time of a location, only changing a row
+# if the value has actually changed.
+LAST_UPDATED_UPDATE_SQL = f"""
+    UPDATE {LOCATION_TABLE} SET last_updated=?
+    WHERE location_id=? AND last_updated IS NOT ?"""
+# Fixed statements, built once rather than formatted on every call.
+LOCATION_UPSERT_SQL = f"""
+    INSERT INTO {LOCATION_TABLE}(
+        location_id, name, region, latitude, longitude, last_updated)
+    VALUES(?, ?, ?, ?, ?, NULL)
+    ON CONFLICT(location_id) DO UPDATE SET
+        name=excluded.name, region=excluded.region,
+        latitude=excluded.latitude, longitude=excluded.longitude"""
+LOCATION_INFO_SQL = f"""
+    SELECT name, region, latitude, longitude, last_updated
+    FROM {LOCATION_TABLE} WHERE location_id=?"""
+# Completed with the placeholders of the location IDs to find.
+LOCATION_INFOS_SQL = f"""
+    SELECT location_id, name, region, latitude, longitude, last_updated
+    FROM {LOCATION_TABLE} WHERE location_id IN """
+FUTURE_WEATHER_SQL = f"""
+    SELECT timestamp, temperature, feels_like_temperature, wind_speed,
+        wind_direction, humidity, precipitation_odds, pressure,
+        visibility, weather_type FROM {TIME_TABLE}
+    WHERE location_id=? AND timestamp - time_zone_offset > ?
+    ORDER BY timestamp ASC LIMIT ?"""
+FUTURE_CONDITIONS_SQL = f"""
+    SELECT timestamp, max_temperature, min_temperature,
+        sunrise AS "sunrise [TIME]", sunset AS "sunset [TIME]",
+        uv, pollution, pollen FROM {DAY_TABLE}
+    WHERE location_id=? AND timestamp - time_zone_offset > ?
+    ORDER BY timestamp ASC LIMIT ?"""
+FUTURE_WARNINGS_SQL = f"""
+    SELECT level, weather_type, issued, start, end, description,
+        time_zone_offset FROM {WARNING_TABLE}
+    WHERE location_id=? AND end - time_zone_offset > ?
+    ORDER BY level DESC, issued ASC"""
 # Simple email regex as a sanity check for user input.
 BASIC_EMAIL_VALIDATION_REGEX = re.compile(r"[^@]+@[^@]+\.[^@]+")
+# Page cache size per connection - negative means KiB rather than pages.
+CACHE_SIZE_KIB = 20000
+# Database page size, only taking effect when the database is created.
+PAGE_SIZE_BYTES = 8192
+# Maximum portion of the database to memory-map for reads.
+MMAP_SIZE_BYTES = 64 * 1024 * 1024
+# WAL size in pages before a commit triggers an automatic checkpoint.
+# Kept high since checkpoints are instead run manually when idle.
+WAL_AUTOCHECKPOINT_PAGES = 10_000
+# Maximum number of records to insert per executemany call.
+INSERT_BATCH_SIZE = 10_000
+
+# Times (HH:MM) are stored as text - columns selected as "name [TIME]"
+# are converted to time objects using the C-level ISO format parser.
+sqlite3.register_converter(
+    "TIME", lambda value: dt.time.fromisoformat(value.decode()))
+
+# Parsed settings by file, alongside the file modification time and size.
+_settings_cache = {}
+# The WAL journal mode persists in the database file, so set it only once.
+_wal_enabled = False
+# Connections are opened once per thread and reused for all operations.
+_thread_data = threading.local()
+_connections = []
+_connections_lock = threading.Lock()
+
+
+def _get_connection() -> sqlite3.Connection:
+    # Returns the connection of the calling thread, opening it if needed.
+    global _wal_enabled
+    connection = getattr(_thread_data, "connection", None)
+    if connection is not None:
+        return connection
+    # Each connection is only used by its own thread, other than
+    # being closed at shutdown, hence the thread check is disabled.
+    connection = sqlite3.connect(
+        DATABASE, detect_types=sqlite3.PARSE_COLNAMES,
+        check_same_thread=False)
+    if not _wal_enabled:
+        # Must precede the WAL switch, which writes a new database to disk.
+        connection.execute(f"PRAGMA page_size = {PAGE_SIZE_BYTES}")
+        # WAL allows reads alongside writes and fewer fsyncs per commit.
+        connection.execute("PRAGMA journal_mode = WAL")
+        _wal_enabled = True
+    # Per-connection settings. NORMAL sync is safe in WAL mode.
+    connection.execute("PRAGMA synchronous = NORMAL")
+    connection.execute("PRAGMA temp_store = MEMORY")
+    connection.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KIB}")
+    connection.execute(f"PRAGMA mmap_size = {MMAP_SIZE_BYTES}")
+    connection.execute(
+        f"PRAGMA wal_autocheckpoint = {WAL_AUTOCHECKPOINT_PAGES}")
+    # Ensure foreign keys are enabled for integrity.
+    connection.execute("PRAGMA foreign_keys = ON")
+    _thread_data.connection = connection
+    # Number of database operations in progress, which may be nested.
+    _thread_data.depth = 0
+    with _connections_lock:
+        _connections.append(connection)
+    return connection
+
+
+def _get_read_connection() -> sqlite3.Connection:
+    # Returns the read-only connection of the calling thread,
+    # opening it if needed. Writing settings and foreign keys are
+    # irrelevant to it, so only the read performance settings apply.
+    connection = getattr(_thread_data, "read_connection", None)
+    if connection is not None:
+        return connection
+    connection = sqlite3.connect(
+        f"{DATABASE.resolve().as_uri()}?mode=ro", uri=True,
+        detect_types=sqlite3.PARSE_COLNAMES, check_same_thread=False)
+    connection.execute("PRAGMA temp_store = MEMORY")
+    connection.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KIB}")
+    connection.execute(f"PRAGMA mmap_size = {MMAP_SIZE_BYTES}")
+    _thread_data.read_connection = connection
+    with _connections_lock:
+        _connections.append(connection)
+    return connection
+
+
+def _start_operation() -> sqlite3.Connection:
+    # Starts a database operation, returning the connection to use.
+    connection = _get_connection()
+    _thread_data.depth += 1
+    return connection
+
+
+def _finish_operation(connection: sqlite3.Connection, success: bool) -> None:
+    # Finishes a database operation. Only the outermost of any nested
+    # operations commits (on success) or rolls back the transaction.
+    _thread_data.depth -= 1
+    if _thread_data.depth:
+        return
+    if success:
+        connection.commit()
+    else:
+        connection.rollback()
 
 
 class Database:
-    """Sqlite3 database wrapper."""
+    """
+    Sqlite3 database wrapper, reusing the connection of the thread.
+    Nested usage joins the transaction of the outermost context.
+    """
 
     def __enter__(self) -> sqlite3.Cursor:
         """Start of database processing context manager."""
-        self.connection = sqlite3.connect(DATABASE)
-        cursor = self.connection.cursor()
-        # Ensure foreign keys are enabled for integrity.
-        cursor.execute("PRAGMA foreign_keys = ON")
-        return cursor
+        self.connection = _start_operation()
+        self.cursor = self.connection.cursor()
+        return self.cursor
     
     def __exit__(self, exception: Exception | None, *_) -> None:
-        """Context manager exited - commit if no error occurred."""
-        if exception is None:
-            self.connection.commit()
-        self.connection.close()
+        """
+        Context manager exited - commit if no error occurred,
+        otherwise roll back. The connection is kept open.
+        """
+        self.cursor.close()
+        _finish_operation(self.connection, exception is None)
+        self.cursor = None
         self.connection = None
 
 
+def _with_cursor(function: Callable[[sqlite3.Cursor], Any]) -> Any:
+    # Lighter equivalent of the Database context manager for hot paths.
+    # Calls the function with a cursor, committing if no error occurs.
+    connection = _start_operation()
+    cursor = connection.cursor()
+    success = False
+    try:
+        result = function(cursor)
+        success = True
+        return result
+    finally:
+        cursor.close()
+        _finish_operation(connection, success)
+
+
+class ReadDatabase:
+    """
+    Read-only sqlite3 database wrapper for queries, reusing a separate
+    read-only connection of the thread. Only committed data is seen.
+    """
+
+    def __enter__(self) -> sqlite3.Cursor:
+        """Start of database querying context manager."""
+        self.cursor = _get_read_connection().cursor()
+        return self.cursor
+    
+    def __exit__(self, *_) -> None:
+        """Context manager exited - nothing to commit."""
+        self.cursor.close()
+        self.cursor = None
+
+
+@contextlib.contextmanager
+def transaction() -> Iterator[sqlite3.Cursor]:
+    """
+    Groups all database operations in the context into one transaction,
+    committed if no error occurs, otherwise rolled back.
+    """
+    with Database() as cursor:
+        if _thread_data.depth == 1:
+            # Take the write lock upfront rather than upgrading to it later,
+            # which can fail when other threads are also writing.
+            cursor.execute("BEGIN IMMEDIATE")
+        yield cursor
+
+
+def checkpoint() -> None:
+    """
+    Copies the WAL contents into the database and truncates the WAL.
+    Intended to be run when idle, avoiding long automatic checkpoints.
+    """
+    _get_connection().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+def close_database() -> None:
+    """Closes all open database connections, to be called on shutdown."""
+    with _connections_lock:
+        for connection in _connections:
+            connection.close()
+        _connections.clear()
+    _thread_data.connection = None
+    _thread_data.read_connection = None
+
+
+atexit.register(close_database)
+
+
 def _remove_duplicates(array: list) -> list:
-    # Deletes duplicates from the array, maintaining order.
-    seen = set()
-    uniques = []
-    for value in array:
-        if value in seen:
-            continue
-        uniques.append(value)
-        seen.add(value)
-    return uniques
+    # Deletes duplicates from the array, maintaining order
+    # (dictionaries preserve insertion order).
+    return list(dict.fromkeys(array))
 
 
-def get_download_settings() -> DownloadSettings:
-    """Reads and validates the download settings JSON file."""
-    with DOWNLOAD_SETTINGS_FILE.open("r", encoding="utf8") as f:
-        json_data = json.load(f)
+def parse_json(text: str | bytes) -> Any:
+    """Parses JSON text, using orjson if installed."""
+    return _json_loads(text)
+
+
+def _load_json(file: pathlib.Path) -> dict | list:
+    # Reads and parses a JSON file.
+    return parse_json(file.read_bytes())
+
+
+def _load_settings(file: pathlib.Path, parse: Callable) -> Any:
+    # Returns parsed settings, reusing them whilst the file is unchanged.
+    # The size is also compared in case of coarse modification times.
+    stat = file.stat()
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = _settings_cache.get(file)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    settings = parse(_load_json(file))
+    _settings_cache[file] = (version, settings)
+    return settings
+
+
+def _parse_download_settings(json_data: dict) -> DownloadSettings:
+    # Validates the download settings JSON data and builds the settings.
     location_ids = json_data["location_ids"]
     if not isinstance(location_ids, list):
         raise TypeError("Location IDs must be a list.")
@@ -144,15 +389,21 @@ def get_download_settings() -> DownloadSettings:
     return DownloadSettings(location_ids, refresh_seconds)
 
 
+def get_download_settings() -> DownloadSettings:
+    """
+    Reads and validates the download settings JSON file.
+    The settings are reused until the file is next modified.
+    """
+    return _load_settings(DOWNLOAD_SETTINGS_FILE, _parse_download_settings)
+
+
 def _basic_valid_email_address(email: str) -> bool:
     # Returns True if the email address is valid to a basic extent.
-    return bool(re.match(BASIC_EMAIL_VALIDATION_REGEX, email))
+    return BASIC_EMAIL_VALIDATION_REGEX.match(email) is not None
 
 
-def get_email_infos() -> list[EmailInfo]:
-    """Validates and returns information on all the emails to send."""
-    with EMAIL_SETTINGS_FILE.open("r", encoding="utf8") as f:
-        json_data = json.load(f)
+def _parse_email_infos(json_data: list) -> list[EmailInfo]:
+    # Validates the email settings JSON data and builds the email infos.
     email_infos = []
     for record in json_data:
         sender = record["sender"]
@@ -185,9 +436,9 @@ def get_email_infos() -> list[EmailInfo]:
         if not times:
             raise ValueError("No email send times added.")
         try:
-            times = _remove_duplicates(
-                [dt.time(*map(int, time_.split(":", maxsplit=1)))
-                    for time_ in record["times"]])
+            times = frozenset(
+                dt.time(*map(int, time_.split(":", maxsplit=1)))
+                for time_ in times)
         except Exception:
             raise ValueError("Invalid list of times (HH:MM).")
         email_info = EmailInfo(
@@ -196,6 +447,14 @@ def get_email_infos() -> list[EmailInfo]:
     return email_infos
 
 
+def get_email_infos() -> list[EmailInfo]:
+    """
+    Validates and returns information on all the emails to send.
+    The information is reused until the file is next modified.
+    """
+    return _load_settings(EMAIL_SETTINGS_FILE, _parse_email_infos)
+
+
 def create_missing_tables() -> None:
     """
     Creates all required tables if they do not already exist.
@@ -247,29 +506,66 @@ def create_missing_tables() -> None:
                 PRIMARY KEY(location_id, weather_type, issued),
                 FOREIGN KEY(location_id)
                     REFERENCES {LOCATION_TABLE}(location_id))""")
-        
+        # Future data is found by the UTC time, which is the stored local
+        # timestamp minus the offset, so index by that expression.
+        for table in (TIME_TABLE, DAY_TABLE):
+            cursor.execute(
+                f"""
+                CREATE INDEX IF NOT EXISTS {table}_location_utc
+                ON {table}(location_id, (timestamp - time_zone_offset))""")
+        cursor.execute(
+            f"""
+            CREATE INDEX IF NOT EXISTS {WARNING_TABLE}_location_utc_end
+            ON {WARNING_TABLE}(location_id, (end - time_zone_offset))""")
+
+
+@functools.lru_cache(maxsize=64)
+def _insert_sql(table: str, values_count: int) -> str:
+    # Returns the INSERT OR REPLACE statement for a table and record width.
+    # The columns are named where known, so values bind in that order.
+    if table not in TABLE_COLUMNS:
+        return (
+            f"INSERT OR REPLACE INTO {table} "
+            f"VALUES({','.join('?' * values_count)})")
+    columns = TABLE_COLUMNS[table]
+    if values_count != len(columns):
+        raise ValueError(
+            f"Records for {table} must have {len(columns)} values.")
+    return (
+        f"INSERT OR REPLACE INTO {table}({','.join(columns)}) "
+        f"VALUES({','.join('?' * values_count)})")
+
 
 def insert_or_replace(table: str, values: tuple) -> None:
     """
     Inserts a given whole record into a table.
     Replace if a record with the same primary key already exists.
     """
-    with Database() as cursor:
-        cursor.execute(
-            f"INSERT OR REPLACE INTO {table} "
-            f"VALUES({','.join('?' * len(values))})", values)
+    insert_or_replace_many(table, [values])
 
 
-def insert_or_replace_many(table: str, records: list[tuple]) -> None:
+def insert_or_replace_many(
+    table: str, records: list[tuple], batch_size: int = INSERT_BATCH_SIZE
+) -> None:
     """
-    Inserts given whole records into a table.
+    Inserts given whole records into a table, in batches of a given size.
     Replace if a record with the same primary key already exists.
+    All records must have the same number of values, in the order
+    of TABLE_COLUMNS for the weather tables.
     """
-    with Database() as cursor:
-        for values in records:
-            cursor.execute(
-                f"INSERT OR REPLACE INTO {table} "
-                f"VALUES({','.join('?' * len(values))})", values)
+    if not records:
+        return
+    values_count = len(records[0])
+    if any(len(values) != values_count for values in records):
+        raise ValueError("All records must have the same number of values.")
+    sql = _insert_sql(table, values_count)
+
+    def insert_batches(cursor: sqlite3.Cursor) -> None:
+        for i in range(0, len(records), batch_size):
+            cursor.executemany(sql, records[i:i+batch_size])
+
+    # All batches are committed together in a single transaction.
+    _with_cursor(insert_batches)
 
 
 def last_updated_changed(location_id: int, last_updated: str) -> bool:
@@ -277,26 +573,32 @@ def last_updated_changed(location_id: int, last_updated: str) -> bool:
     Returns True if the last updated date/time for a given location ID has
     changed, also updates the last updated date/time if a change has occurred.
     """
-    with Database() as cursor:
-        previous_last_updated = cursor.execute(
-            f"SELECT last_updated FROM {LOCATION_TABLE} WHERE location_id=?",
-                (location_id,)).fetchone()[0]
-        changed = last_updated != previous_last_updated
-        if changed:
-            cursor.execute(
-                f"""
-                UPDATE {LOCATION_TABLE} SET last_updated=? WHERE location_id=?
-                """, (last_updated, location_id))
-    return changed
+    return _with_cursor(
+        lambda cursor: cursor.execute(
+            LAST_UPDATED_UPDATE_SQL,
+            (last_updated, location_id, last_updated)
+        ).rowcount == 1)
 
 
 def get_location_info(location_id: int) -> LocationInfo:
     """Returns the location information by location ID."""
-    with Database() as cursor:
-        _, name, region, latitude, longitude, last_updated = cursor.execute(
-            f"SELECT * FROM {LOCATION_TABLE} WHERE location_id=?",
-            (location_id,)).fetchone()
-    return LocationInfo(name, region, latitude, longitude, last_updated)
+    with ReadDatabase() as cursor:
+        record = cursor.execute(
+            LOCATION_INFO_SQL, (location_id,)).fetchone()
+    return LocationInfo(*record)
+
+
+def get_location_infos(location_ids: Iterable[int]) -> dict[int, LocationInfo]:
+    """Returns the information of multiple locations, by location ID."""
+    location_ids = list(location_ids)
+    if not location_ids:
+        return {}
+    with ReadDatabase() as cursor:
+        return {
+            record[0]: LocationInfo(*record[1:])
+            for record in cursor.execute(
+                f"{LOCATION_INFOS_SQL}({','.join('?' * len(location_ids))})",
+                location_ids)}
 
 
 def update_location(
@@ -306,81 +608,78 @@ def update_location(
     Updates a given location, except last updated time.
     Create a new record if none with the given location ID exists.
     """
-    # Check if there is existing data for the given location.
-    with Database() as cursor:
-        exists = cursor.execute(
-            f"""
-            SELECT EXISTS (SELECT * FROM {LOCATION_TABLE} WHERE location_id=?)
-            """, (location_id,)).fetchone()[0]
-    if not exists:
-        record = (location_id, name, region, latitude, longitude, None)
-        insert_or_replace(LOCATION_TABLE, record)
-        return
     with Database() as cursor:
         cursor.execute(
-            f"""
-            UPDATE {LOCATION_TABLE}
-            SET name=?, region=?, latitude=?, longitude=? WHERE location_id=?
-            """, (name, region, latitude, longitude, location_id))
+            LOCATION_UPSERT_SQL,
+            (location_id, name, region, latitude, longitude))
 
 
-def get_future_weather(location_id: int, hours: int) -> list[WeatherInfo]:
-    """Returns weather conditions for the next N hours, as available."""
-    current_timestamp = time.time()
-    with Database() as cursor:
+def get_future_weather(
+    location_id: int, hours: int, now: float | None = None
+) -> list[WeatherInfo]:
+    """
+    Returns weather conditions for the next N hours, as available.
+    The current timestamp can be provided, otherwise the time now is used.
+    """
+    current_timestamp = time.time() if now is None else now
+    # Timestamps are local date/times stored as if UTC.
+    from_timestamp = dt.datetime.fromtimestamp
+    utc = dt.timezone.utc
+    visibilities = get.VISIBILITIES_REVERSED
+    weather_types = get.WEATHER_TYPES
+    with ReadDatabase() as cursor:
+        # Build the results directly whilst iterating over the cursor.
         records = cursor.execute(
-            f"""
-            SELECT timestamp, temperature, feels_like_temperature, wind_speed,
-                wind_direction, humidity, precipitation_odds, pressure,
-                visibility, weather_type FROM {TIME_TABLE}
-            WHERE location_id=? AND timestamp - time_zone_offset > ?
-            ORDER BY timestamp ASC LIMIT ?
-            """, (location_id, current_timestamp, hours)).fetchall()
-    weather_infos = [
-        WeatherInfo(
-            dt.datetime.utcfromtimestamp(record[0]), record[1], record[2],
-            record[3], record[4], record[5], record[6], record[7],
-            get.VISIBILITIES_REVERSED[record[8]], get.WEATHER_TYPES[record[9]])
-        for record in records]
+            FUTURE_WEATHER_SQL, (location_id, current_timestamp, hours))
+        weather_infos = [
+            WeatherInfo(
+                from_timestamp(record[0], utc), record[1], record[2],
+                record[3], record[4], record[5], record[6], record[7],
+                visibilities[record[8]], weather_types[record[9]])
+            for record in records]
     return weather_infos
 
 
-def get_future_conditions(location_id: int, days: int) -> list[ConditionsInfo]:
-    """Returns daily conditions for the next N available days."""
-    current_timestamp = time.time()
-    with Database() as cursor:
+def get_future_conditions(
+    location_id: int, days: int, now: float | None = None
+) -> list[ConditionsInfo]:
+    """
+    Returns daily conditions for the next N available days.
+    The current timestamp can be provided, otherwise the time now is used.
+    """
+    current_timestamp = time.time() if now is None else now
+    from_timestamp = dt.datetime.fromtimestamp
+    utc = dt.timezone.utc
+    with ReadDatabase() as cursor:
         records = cursor.execute(
-            f"""
-            SELECT timestamp, max_temperature, min_temperature,
-                sunrise, sunset, uv, pollution, pollen FROM {DAY_TABLE}
-            WHERE location_id=? AND timestamp - time_zone_offset > ?
-            ORDER BY timestamp ASC LIMIT ?
-            """, (location_id, current_timestamp, days)).fetchall()
-    conditions_infos = [
-        ConditionsInfo(
-            dt.datetime.utcfromtimestamp(record[0]).date(),
-            record[1], record[2], dt.time(*map(int, record[3].split(":"))),
-            dt.time(*map(int, record[4].split(":"))), record[5], record[6],
-            record[7]) for record in records]
+            FUTURE_CONDITIONS_SQL, (location_id, current_timestamp, days))
+        conditions_infos = [
+            ConditionsInfo(
+                from_timestamp(record[0], utc).date(),
+                *record[1:]) for record in records]
     return conditions_infos
 
 
-def get_future_warnings(location_id: int) -> list[WarningInfo]:
-    """Returns a list of all the warnings in place for a given location."""
-    current_timestamp = time.time()
-    with Database() as cursor:
+def get_future_warnings(
+    location_id: int, now: float | None = None
+) -> list[WarningInfo]:
+    """
+    Returns a list of all the warnings in place for a given location.
+    The current timestamp can be provided, otherwise the time now is used.
+    """
+    current_timestamp = time.time() if now is None else now
+    from_timestamp = dt.datetime.fromtimestamp
+    utc = dt.timezone.utc
+    warning_levels = get.WARNINGS_REVERSED
+    with ReadDatabase() as cursor:
         # Only display warnings that have not finished (in the past).
         records = cursor.execute(
-            f"""
-            SELECT level, weather_type, issued, start, end, description,
-                time_zone_offset FROM {WARNING_TABLE}
-            WHERE location_id=? AND end - time_zone_offset > ?
-            ORDER BY level DESC, issued ASC
-            """, (location_id, current_timestamp)).fetchall()
-    warnings = [
-        WarningInfo(
-            get.WARNINGS_REVERSED[record[0]], record[1],
-            *map(dt.datetime.utcfromtimestamp, record[2:5]), record[5],
-            current_timestamp >= record[3] - record[6])
-        for record in records]
+            FUTURE_WARNINGS_SQL, (location_id, current_timestamp))
+        warnings = [
+            WarningInfo(
+                warning_levels[record[0]], record[1],
+                *(from_timestamp(timestamp, utc) for timestamp in record[2:5]),
+                record[5],
+                current_timestamp >= record[3] - record[6])
+            for record in records]
     return warnings
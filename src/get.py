@@ -6,13 +6,18 @@ or new data.
 """
 import calendar
 import datetime as dt
-import json
+import functools
 import logging
+import re
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from timeit import default_timer as timer
+from typing import Iterator
 
 import requests as rq
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from selectolax.lexbor import LexborHTMLParser
+from urllib3.util.retry import Retry
 
 import data
 
@@ -44,7 +49,43 @@ WARNING_LEVELS = {"Yellow": 0, "Amber": 1, "Red": 2}
 WARNINGS_REVERSED = {value: key for key, value in WARNING_LEVELS.items()}
 # Month literals.
 MONTHS = tuple(calendar.month_name)[1:]
+MONTH_NUMBERS = {month: i for i, month in enumerate(MONTHS, 1)}
+# Forecast JSON embedded in the raw (undecoded) page.
+FORECAST_JSON_REGEX = re.compile(
+    rb'data-state-id="forecast"[^>]*>(.*?)</script>', re.DOTALL)
+# Present in the raw page whenever there are weather warnings.
+WARNING_MARKER = b"wr-c-weather-warning"
+# Time and date in warning texts, such as 09:00 (BST) on Monday 12 October,
+# searched separately so either may come first.
+WARNING_TIME_REGEX = re.compile(r"\b(\d{1,2}):(\d{2})\b")
+WARNING_DATE_REGEX = re.compile(rf"\b(\d{{1,2}})\s+({'|'.join(MONTHS)})\b")
+# Maximum number of forecast dates/times to remember the timestamps of.
+LOCAL_TIMESTAMP_CACHE_SIZE = 1024
+# Maximum number of warning texts to remember the timestamps of.
+WARNING_TIMESTAMP_CACHE_SIZE = 512
 MAX_REQUEST_ATTEMPTS = 3
+# Connect/read timeout so a stalled request cannot hang a refresh cycle.
+REQUEST_TIMEOUT_SECONDS = 10
+# Delay factor between request attempts (exponential backoff).
+REQUEST_BACKOFF_FACTOR = 0.5
+# Server errors that are worth retrying.
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+# Maximum number of location pages to fetch concurrently.
+MAX_FETCH_WORKERS = 8
+
+# Session reusing connections (keep-alive) across all requests.
+# gzip/deflate responses are already accepted by default.
+SESSION = rq.Session()
+SESSION.headers.update(HEADERS)
+# All requests go to the one host, with a kept-alive connection per worker.
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=1, pool_maxsize=MAX_FETCH_WORKERS,
+    max_retries=Retry(
+        total=MAX_REQUEST_ATTEMPTS - 1, backoff_factor=REQUEST_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUS_CODES)))
+# Conditional request headers per location, from its last stored page,
+# so that unchanged pages are not downloaded again (304 Not Modified).
+_page_validators: dict[int, dict[str, str]] = {}
 
 
 def add_location_if_missing(location_info: dict) -> None:
@@ -54,66 +95,98 @@ def add_location_if_missing(location_info: dict) -> None:
         location_info["latitude"], location_info["longitude"])
 
 
-def process_json_data(location_id: int, json_data: dict) -> None:
-    """Inserts and updates weather/conditions records from the JSON data."""
-    weather_time_records = []
-    daily_conditions_records = []
+# The same dates and times recur across locations and cycles.
+@functools.lru_cache(maxsize=LOCAL_TIMESTAMP_CACHE_SIZE)
+def _local_timestamp(local_date: str, local_time: str) -> int:
+    # Returns the timestamp of a local date and time, treated as UTC.
+    # Dates (YYYY-MM-DD) and times (HH:MM) have a fixed format, so they are
+    # sliced directly.
+    return calendar.timegm((
+        int(local_date[:4]), int(local_date[5:7]), int(local_date[8:10]),
+        int(local_time[:2]), int(local_time[3:5]), 0))
+
+
+def _weather_time_records(
+    location_id: int, time_zone_offset: int, forecasts: list[dict]
+) -> Iterator[tuple]:
+    # Returns the hourly weather records of the forecasts.
+    # Local names for the comprehension below.
+    local_timestamp = _local_timestamp
+    visibilities = VISIBILITIES
+    gusts_mph = GUSTS_MPH
+    # Values in the order of data.TABLE_COLUMNS[data.TIME_TABLE].
+    return (
+        (
+            location_id,
+            local_timestamp(report["localDate"], report["timeslot"]),
+            time_zone_offset,
+            report["temperatureC"], report["feelsLikeTemperatureC"],
+            report["windSpeedMph"] if report["gustSpeedMph"] < gusts_mph
+            else report["gustSpeedMph"],
+            report["windDirection"], report["humidity"],
+            report["precipitationProbabilityInPercent"],
+            report["pressure"], visibilities[report["visibility"]],
+            report["weatherType"])
+        for forecast in forecasts
+        for report in forecast["detailed"]["reports"])
+
+
+def _daily_conditions_records(
+    location_id: int, time_zone_offset: int, forecasts: list[dict]
+) -> Iterator[tuple]:
+    # Returns the daily conditions records of the forecasts.
+    # Skip the current day's forecast - do not capture day conditions
+    # as it may not be reflective of the entire day.
+    # If captured at night, UV will display as low - misleading.
+    days = (forecast["summary"]["report"] for forecast in forecasts[1:])
+    # Values in the order of data.TABLE_COLUMNS[data.DAY_TABLE].
+    return (
+        (
+            location_id, _local_timestamp(day["localDate"], "00:00"),
+            time_zone_offset, day["maxTempC"], day["minTempC"],
+            day["sunrise"], day["sunset"], day["uvIndex"],
+            day["pollutionIndex"], day["pollenIndex"])
+        for day in days)
+
+
+def process_json_data(
+    location_id: int, json_data: dict
+) -> tuple[Iterator[tuple], Iterator[tuple]]:
+    """
+    Returns the weather/conditions records from the JSON data,
+    generated lazily so they can be added straight to a larger list.
+    """
     time_zone_offset = dt.datetime.fromisoformat(
         json_data["issueDate"]).utcoffset()
     time_zone_offset_seconds = (
         time_zone_offset.days * 86400 + time_zone_offset.seconds)
-    for i, forecast in enumerate(json_data["forecasts"]):
-        # Hourly data
-        for report in forecast["detailed"]["reports"]:
-            timestamp = dt.datetime.strptime(
-                f"{report['localDate']} {report['timeslot']}",
-                "%Y-%m-%d %H:%M").replace(tzinfo=dt.timezone.utc).timestamp()
-            wind_speed = (
-                report["windSpeedMph"] if report["gustSpeedMph"] < GUSTS_MPH
-                else report["gustSpeedMph"]) 
-            record = (
-                location_id, timestamp, time_zone_offset_seconds,
-                report["temperatureC"], report["feelsLikeTemperatureC"],
-                wind_speed, report["windDirection"], report["humidity"],
-                report["precipitationProbabilityInPercent"],
-                report["pressure"], VISIBILITIES[report["visibility"]],
-                report["weatherType"])
-            weather_time_records.append(record)
-        # Daily data.
-        if i == 0:
-            # Current day's forecast - do not capture day conditions
-            # as it may not be reflective of the entire day.
-            # If captured at night, UV will display as low - misleading.
-            continue
-        day = forecast["summary"]["report"]
-        day_timestamp = dt.datetime.strptime(
-            day["localDate"], "%Y-%m-%d"
-        ).replace(tzinfo=dt.timezone.utc).timestamp()
-        record = (
-            location_id, day_timestamp, time_zone_offset_seconds,
-            day["maxTempC"], day["minTempC"], day["sunrise"], day["sunset"],
-            day["uvIndex"], day["pollutionIndex"], day["pollenIndex"])
-        daily_conditions_records.append(record)
-    data.insert_or_replace_many(data.TIME_TABLE, weather_time_records)
-    data.insert_or_replace_many(data.DAY_TABLE, daily_conditions_records)
+    forecasts = json_data["forecasts"]
+    return (
+        _weather_time_records(
+            location_id, time_zone_offset_seconds, forecasts),
+        _daily_conditions_records(
+            location_id, time_zone_offset_seconds, forecasts))
 
 
 def extract_warning_text_timestamp(text: str) -> int:
     """Returns the date as seen in one of the weather warnings texts."""
-    parts = text.split()
-    hour = None
-    minute = None
-    month = None
-    day = None
-    for i, part in enumerate(parts):
-        if ":" in part and part.replace(":", "").isdigit():
-            hour, minute = map(int, part.split(":"))
-        if part in MONTHS:
-            month = MONTHS.index(part) + 1
-            day = int(parts[i-1])
+    # The year is deduced from the current date, so it is part of the key.
+    return _extract_warning_text_timestamp(text, dt.date.today())
+
+
+# Warning texts recur every cycle until the warnings expire.
+@functools.lru_cache(maxsize=WARNING_TIMESTAMP_CACHE_SIZE)
+def _extract_warning_text_timestamp(text: str, current_date: dt.date) -> int:
+    time_match = WARNING_TIME_REGEX.search(text)
+    date_match = WARNING_DATE_REGEX.search(text)
+    if time_match is None or date_match is None:
+        raise ValueError(f"Warning time not found: {text}")
+    hour = int(time_match[1])
+    minute = int(time_match[2])
+    day = int(date_match[1])
+    month = MONTH_NUMBERS[date_match[2]]
     # Year not given, but use common sense to deduce it (timezones irrelevant).
     # No warning is going to last very long in reality (usually 1 week max).
-    current_date = dt.date.today()
     current_year = current_date.year
     if (current_date - dt.date(current_year, month, day)).days > 180:
         year = current_year + 1
@@ -123,75 +196,162 @@ def extract_warning_text_timestamp(text: str) -> int:
         tzinfo=dt.timezone.utc).timestamp()
 
 
-def add_weather_warnings(location_id: int, soup: BeautifulSoup) -> None:
-    """
-    Searches the HTML page for any weather warnings and inserts them
-    into the database as required.
-    """
+def get_weather_warnings(
+    location_id: int, tree: LexborHTMLParser
+) -> list[tuple]:
+    """Searches the HTML page for any weather warnings records."""
     warning_records = []
-    for warning_div in soup.find_all("div", class_="wr-c-weather-warning"):
-        level, weather_type = warning_div.find("h3").text.split(" warning of ")
+    for warning_div in tree.css("div.wr-c-weather-warning"):
+        level, weather_type = (
+            warning_div.css_first("h3").text().split(" warning of "))
         level = WARNING_LEVELS[level]
-        issued_at_text = warning_div.find(
-            "p", class_="wr-c-weather-warning__issued-at-date").text
+        issued_at_text = warning_div.css_first(
+            "p.wr-c-weather-warning__issued-at-date").text()
         start_text, end_text = [
-            p.text for p in warning_div.find(
-                "div", class_="wr-c-weather-warning__warning-period"
-            ).find_all("p") if "wr-o-active" not in p["class"]]
+            p.text() for p in warning_div.css(
+                "div.wr-c-weather-warning__warning-period"
+                " p:not(.wr-o-active)")]
         issued = extract_warning_text_timestamp(issued_at_text)
         start = extract_warning_text_timestamp(start_text)
         end = extract_warning_text_timestamp(end_text)
-        description = warning_div.find(
-            "p", class_="wr-c-weather-warning__warning-text").text.strip()
+        description = warning_div.css_first(
+            "p.wr-c-weather-warning__warning-text").text().strip()
         # BST (UTC+1) or GMT (UTC).
         time_zone_offset = 0 if "GMT" in issued_at_text else 3600
+        # Values in the order of data.TABLE_COLUMNS[data.WARNING_TABLE].
         record = (
             location_id, level, weather_type,
             issued, start, end, time_zone_offset, description)
         warning_records.append(record)
-    data.insert_or_replace_many(data.WARNING_TABLE, warning_records)
-        
+    return warning_records
+
+
+def fetch_page(location_id: int) -> rq.Response:
+    """
+    Retrieves the BBC Weather page of a location, with a 304 response
+    if the page has not been modified since it was last stored.
+    """
+    url = f"{BBC_WEATHER_BASE_URL}/{location_id}"
+    # The session attempts the request multiple times if needed.
+    response = SESSION.get(
+        url, headers=_page_validators.get(location_id),
+        timeout=REQUEST_TIMEOUT_SECONDS)
+    response.raise_for_status()
+    return response
+
+
+def _get_page_validators(response: rq.Response) -> dict[str, str]:
+    # Conditional request headers to send for the page next time.
+    validators = {}
+    if "ETag" in response.headers:
+        validators["If-None-Match"] = response.headers["ETag"]
+    if "Last-Modified" in response.headers:
+        validators["If-Modified-Since"] = response.headers["Last-Modified"]
+    return validators
+
+
+def parse_page(
+    location_id: int, response: rq.Response
+) -> tuple[dict, re.Match] | None:
+    """
+    Decodes the forecast JSON of the BBC Weather page of a location,
+    returning it with its match in the page, or None if not modified.
+    """
+    if response.status_code == 304:
+        logging.info(f"{location_id}: Page not modified.")
+        return None
+    # Extract the forecast JSON straight from the page bytes, no decoding.
+    forecast_match = FORECAST_JSON_REGEX.search(response.content)
+    if forecast_match is None:
+        raise ValueError(f"{location_id}: Forecast data not found.")
+    json_data = data.parse_json(forecast_match[1])["data"]
+    return json_data, forecast_match
+
+
+def get_page_records(
+    location_id: int, json_data: dict, forecast_match: re.Match
+) -> tuple[Iterator[tuple], Iterator[tuple], list[tuple]]:
+    """
+    Returns the weather/conditions/warnings records of a parsed page,
+    only needed once its data is known to have been updated.
+    """
+    weather_time_records, daily_conditions_records = process_json_data(
+        location_id, json_data)
+    content = forecast_match.string
+    # Warnings are rare - only parse the HTML if there may be any.
+    if WARNING_MARKER not in content:
+        return weather_time_records, daily_conditions_records, []
+    # Only the warnings are left to find in the HTML, so the (large)
+    # forecast JSON is cut out instead of being parsed again as text.
+    tree = LexborHTMLParser(
+        content[:forecast_match.start(1)] + content[forecast_match.end(1):])
+    warning_records = get_weather_warnings(location_id, tree)
+    return weather_time_records, daily_conditions_records, warning_records
+
 
 def main() -> None:
     """Main procedure of the program."""
     data.create_missing_tables()
-    while True:
-        logging.info(
-            f"Obtaining data at {dt.datetime.now().replace(microsecond=0)}")
-        start = timer()
-        download_settings = data.get_download_settings()
-        for location_id in download_settings.location_ids:
-            url = f"{BBC_WEATHER_BASE_URL}/{location_id}"
-            # Attempts the request multiple times for improved robustness.
-            attempts = MAX_REQUEST_ATTEMPTS
-            while True:
-                try:
-                    response = rq.get(url, headers=HEADERS)
-                    if response.status_code == 200:
-                        # Attempts to use LXML is available.
-                        try:
-                            soup = BeautifulSoup(response.text, "lxml")
-                        except Exception:
-                            soup = BeautifulSoup(response.text, "html.parser")
-                        break
-                except Exception as e:
-                    attempts -= 1
-                    if not attempts:
-                        raise e
-                    time.sleep(1)     
-            json_data = json.loads(
-                soup.find("script", {"data-state-id": "forecast"}).text
-            )["data"]
-            add_location_if_missing(json_data["location"])
-            last_updated = json_data["lastUpdated"]
-            if data.last_updated_changed(location_id, last_updated):
-                logging.info(f"{location_id}: Data updated.")
-                process_json_data(location_id, json_data)
-                add_weather_warnings(location_id, soup)
-            else:
-                logging.info(f"{location_id}: No data update.")
-        stop = timer()
-        time.sleep(max(0, download_settings.refresh_seconds - (stop - start)))
+    # Pages are fetched concurrently since most time is spent waiting on
+    # the network, whilst parsing and database work stays on this thread.
+    with ThreadPoolExecutor(MAX_FETCH_WORKERS) as executor:
+        while True:
+            logging.info(
+                "Obtaining data at "
+                f"{dt.datetime.now().replace(microsecond=0)}")
+            start = timer()
+            download_settings = data.get_download_settings()
+            location_ids = download_settings.location_ids
+            pages = {}
+            page_validators = {}
+            futures = {
+                executor.submit(fetch_page, location_id): location_id
+                for location_id in location_ids}
+            # Each page is decoded as soon as it arrives, whilst the
+            # remaining pages are still being fetched.
+            for future in as_completed(futures):
+                location_id = futures[future]
+                # Re-raises any error in the worker.
+                response = future.result()
+                page = parse_page(location_id, response)
+                if page is not None:
+                    pages[location_id] = page
+                    page_validators[location_id] = (
+                        _get_page_validators(response))
+            all_time_records = []
+            all_day_records = []
+            all_warning_records = []
+            # All the data of the cycle is stored in a single transaction,
+            # only opened once fetching is done so the write lock is brief.
+            with data.transaction():
+                for location_id, (json_data, forecast_match) in (
+                    pages.items()
+                ):
+                    add_location_if_missing(json_data["location"])
+                    last_updated = json_data["lastUpdated"]
+                    if not data.last_updated_changed(
+                        location_id, last_updated
+                    ):
+                        logging.info(f"{location_id}: No data update.")
+                        continue
+                    logging.info(f"{location_id}: Data updated.")
+                    time_records, day_records, warning_records = (
+                        get_page_records(
+                            location_id, json_data, forecast_match))
+                    all_time_records.extend(time_records)
+                    all_day_records.extend(day_records)
+                    all_warning_records.extend(warning_records)
+                data.insert_or_replace_many(data.TIME_TABLE, all_time_records)
+                data.insert_or_replace_many(data.DAY_TABLE, all_day_records)
+                data.insert_or_replace_many(
+                    data.WARNING_TABLE, all_warning_records)
+            # Only skip unchanged pages once their data has been committed.
+            _page_validators.update(page_validators)
+            # Idle until the next refresh - a good time to checkpoint.
+            data.checkpoint()
+            stop = timer()
+            time.sleep(
+                max(0, download_settings.refresh_seconds - (stop - start)))
 
 
 if __name__ == "__main__":
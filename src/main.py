@@ -6,7 +6,6 @@ upon failure (error) in either script.
 import data
 import logging
 import threading
-import time
 import sys
 from typing import Callable
 
@@ -16,28 +15,32 @@ import send
 
 # Allow some time for the get script to begin and update any data.
 SEND_START_DELAY = 15
+# An untimed wait cannot be interrupted by Ctrl+C on Windows, so waiting
+# for failure times out this often - rarely, but still responsive to Ctrl+C.
+FAILURE_POLL_SECONDS = 2
 
 
 class WeatherAutomation:
     """Class handling the script running, and error handling."""
 
     def __init__(self) -> None:
-        self.exception = None
+        # Set upon failure in either script.
+        self._failed = threading.Event()
     
     def start(self) -> None:
         """Starts the dual-script."""
         logging.info("Data collection script started.")
         threading.Thread(
             target=lambda: self._run(get.main), daemon=True).start()
-        time.sleep(SEND_START_DELAY)
-        logging.info("Email sending script started.")
-        threading.Thread(
-            target=lambda: self._run(send.main), daemon=True).start()
-        # Busy waiting, waiting for an exception otherwise keep running.
-        while True:
-            if self.exception is not None:
-                sys.exit(-1)
-            time.sleep(0.25)
+        # Stops early if the get script fails in the meantime.
+        if not self._failed.wait(SEND_START_DELAY):
+            logging.info("Email sending script started.")
+            threading.Thread(
+                target=lambda: self._run(send.main), daemon=True).start()
+            # Keep running until an exception occurs.
+            while not self._failed.wait(FAILURE_POLL_SECONDS):
+                pass
+        sys.exit(-1)
     
     def _run(self, function: Callable) -> None:
         try:
@@ -45,7 +48,7 @@ class WeatherAutomation:
         except Exception as e:
             # Error occurred - terminate overall script.
             logging.critical(f"Fatal Error: {e}")
-            self.exception = e
+            self._failed.set()
 
 
 def main() -> None:
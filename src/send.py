@@ -1,15 +1,13 @@
 """Automated email sending tool based on the collected weather data."""
+import bisect
 import datetime as dt
+import html
 import logging
 import smtplib
 import time
+from concurrent.futures import ThreadPoolExecutor
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
-from timeit import default_timer as timer
-
-import dominate
-import dominate.tags as tags
-from dominate.util import text
 
 import data
 import get
@@ -47,43 +45,148 @@ POLLEN_CLASSES = {
 WARNING_CLASSES = {
     "Yellow": "yellow-warning", "Amber": "amber-warning", "Red": "red-warning"
 }
+# Report CSS.
+EMAIL_CSS = """\
+    * {font-family: sans-serif;}
+    h1 {font-size: 40px;}
+    h2 {font-size: 35px;}
+    h3 {font-size: 25px;}
+    p {white-space: pre-line;}
+    span {white-space: nowrap;}
+
+    .hottest {color: #c21a11;}
+    .hotter {color: #f02318;}
+    .warm {color: #f07f0e;}
+    .mild {color: #17c223;}
+    .cool {color: #0ca9f7;}
+    .colder {color: #0c86f7;}
+    .coldest {color: #267bc9;}
+
+    .extreme-uv {color: violet;}
+    .gusts, .precip-likely, .very-poor-visibility, .very-high-uv,
+        .very-high-pollution, .very-high-pollen {color: red;}
+    .precip-chance, .poor-visibility, .high-uv,
+        .high-pollution, .high-pollen {color: orange;}
+    .moderate-uv, .moderate-pollution, .moderate-pollen
+        {color: #c3eb34;}
+    .moderate-visibility, .good-visibility, .low-uv, .low-pollen,
+        .low-pollution {color: #00cc00;}
+    .very-good-visibility, .excellent-visibility {color: #0ca9f7;}
+
+    .yellow-warning {background: yellow;}
+    .amber-warning {background: orange;}
+    .red-warning {background: red;}
+    .yellow-warning, .amber-warning, .red-warning {
+        padding: 10px;
+        margin: 10px;
+    }
+
+    .major-info {font-size: 18px; white-space: pre-line;}
+    .minor-info {font-size: 12px; white-space: pre-line;}
+"""
+# Report HTML of each warning/hour/day, filled in with str.format.
+WARNING_HTML = (
+    '    <div class="{warning_class}">\n'
+    "      <h3>{level} warning for {weather_type} {active}</h3>\n"
+    "      <p>{start_label}: {start}</p>\n"
+    "      <p>Ends: {end}</p>\n"
+    "      <p><em>{description}</em></p>\n"
+    "      <p>Issued: {issued}</p>\n"
+    "    </div>\n")
+HOURLY_WEATHER_HTML = (
+    "    <h3>{time}</h3>\n"
+    '    <p><span class="major-info">Weather Type: {weather_type}\n'
+    'Temperature: <span class="{temperature_class}">{temperature}°C</span>'
+    ' (feels like <span class="{feels_like_temperature_class}">'
+    "{feels_like_temperature}°C</span>)\n"
+    "Wind: {wind_speed}(from {wind_direction})\n</span>"
+    '<span class="minor-info">Humidity: {humidity}%\n'
+    'Precipitation odds: <span class="{precipitation_class}">'
+    "{precipitation_odds}%</span>\n"
+    "Pressure: {pressure}mb\n"
+    'Visibility: <span class="{visibility_class}">{visibility}</span>'
+    "</span></p>\n")
+DAILY_CONDITIONS_HTML = (
+    "    <h3>{date}</h3>\n"
+    '    <p><div class="major-info">Max / Min temperature: '
+    '<span class="{max_temperature_class}">{max_temperature}°C</span> / '
+    '<span class="{min_temperature_class}">{min_temperature}°C</span>\n'
+    "Sunrise / Sunset: {sunrise} / {sunset}\n"
+    'UV Index: <span class="{uv_class}">{uv}</span>')
+# Everything in the report head after the title, the same for all reports.
+EMAIL_HEAD_END = f"    <style>\n{EMAIL_CSS}    </style>\n  </head>\n"
 
 # Email sending configuration information.
 SMTP_SERVER = "smtp.gmail.com"
 SMTP_PORT = 587
-REFRESH_SECONDS = 45
 MAX_EMAIL_SEND_ATTEMPTS = 3
+# Errors sending a message over a working connection.
+MESSAGE_REJECTED_ERRORS = (
+    smtplib.SMTPDataError, smtplib.SMTPRecipientsRefused)
+# Maximum number of senders to send emails from concurrently.
+MAX_SEND_WORKERS = 4
+
+
+def _get_class_bounds(classes: dict[str, int]) -> tuple[list[int], list[str]]:
+    # Returns the minimum values in ascending order, and their classes.
+    pairs = sorted(classes.items(), key=lambda pair: pair[1])
+    return (
+        [min_value for _, min_value in pairs],
+        [class_ for class_, _ in pairs])
+
+
+# Class bounds precomputed for binary search.
+TEMPERATURE_CLASS_BOUNDS = _get_class_bounds(TEMPERATURE_CLASSES)
+PRECIPITATION_ODDS_CLASS_BOUNDS = _get_class_bounds(PRECIPITATION_ODDS_CLASSES)
+UV_CLASS_BOUNDS = _get_class_bounds(UV_CLASSES)
+POLLUTION_CLASS_BOUNDS = _get_class_bounds(POLLUTION_CLASSES)
+POLLEN_CLASS_BOUNDS = _get_class_bounds(POLLEN_CLASSES)
 
 
-def _get_class(value: int, classes: dict[str, int]) -> str:
-    # Returns appropriate class based on class, min pairs.
-    return next(
-        class_ for class_, min_value in classes.items() if value >= min_value)
+def _get_class(value: int, bounds: tuple[list[int], list[str]]) -> str:
+    # Returns appropriate class based on the class bounds.
+    min_values, classes = bounds
+    index = bisect.bisect_right(min_values, value) - 1
+    if index < 0:
+        raise ValueError(f"No class for value: {value}")
+    return classes[index]
 
 
 def get_temperature_class(temperature: int) -> str:
     """Returns the appropriate temperature class for a given temperature."""
-    return _get_class(temperature, TEMPERATURE_CLASSES)
+    return _get_class(temperature, TEMPERATURE_CLASS_BOUNDS)
 
 
 def get_precipitation_class(odds: int) -> str:
     """Returns the appropriate preciptation class based on the chance."""
-    return _get_class(odds, PRECIPITATION_ODDS_CLASSES)
+    return _get_class(odds, PRECIPITATION_ODDS_CLASS_BOUNDS)
 
 
 def get_uv_class(uv: int) -> str:
     """Returns the UV class based on the UV index."""
-    return _get_class(uv, UV_CLASSES)
+    return _get_class(uv, UV_CLASS_BOUNDS)
 
 
 def get_pollution_class(pollution: int) -> str:
     """Returns the pollution class based on the pollution index."""
-    return _get_class(pollution, POLLUTION_CLASSES)
+    return _get_class(pollution, POLLUTION_CLASS_BOUNDS)
 
 
 def get_pollen_class(pollen: int) -> str:
     """Returns the pollen class based on the pollen index."""
-    return _get_class(pollen, POLLEN_CLASSES)
+    return _get_class(pollen, POLLEN_CLASS_BOUNDS)
+
+
+def _format_time(time_: dt.time | dt.datetime) -> str:
+    # Returns the time in HH:MM, faster than strftime.
+    return f"{time_.hour:02}:{time_.minute:02}"
+
+
+def _format_date_time(date_time: dt.datetime) -> str:
+    # Returns the date/time in YYYY-MM-DD at HH:MM, faster than strftime.
+    return (
+        f"{date_time.year:04}-{date_time.month:02}-{date_time.day:02} "
+        f"at {date_time.hour:02}:{date_time.minute:02}")
 
 
 def get_title(location_info: data.LocationInfo) -> str:
@@ -94,164 +197,122 @@ def get_title(location_info: data.LocationInfo) -> str:
     return f"Weather Report for {location}"
 
 
+def _span(content: str | int, class_: str) -> str:
+    # Returns the content wrapped in a span with a given class.
+    return f'<span class="{class_}">{content}</span>'
+
+
 def generate_html_email(
-    location_id: int, location_info: data.LocationInfo
+    location_id: int, location_info: data.LocationInfo,
+    title: str | None = None
 ) -> str:
     """
     Takes the weather data for a given location info and 
     generates a HTML report ready to send as an email.
+    The title can be passed in if already known.
     """
-    document = dominate.document(get_title(location_info))
-    # Set report CSS.
-    with document.head:
-        tags.style(
-            r"""
-            * {font-family: sans-serif;}
-            h1 {font-size: 40px;}
-            h2 {font-size: 35px;}
-            h3 {font-size: 25px;}
-            p {white-space: pre-line;}
-            span {white-space: nowrap;}
-
-            .hottest {color: #c21a11;}
-            .hotter {color: #f02318;}
-            .warm {color: #f07f0e;}
-            .mild {color: #17c223;}
-            .cool {color: #0ca9f7;}
-            .colder {color: #0c86f7;}
-            .coldest {color: #267bc9;}
-
-            .extreme-uv {color: violet;}
-            .gusts, .precip-likely, .very-poor-visibility, .very-high-uv,
-                .very-high-pollution, .very-high-pollen {color: red;}
-            .precip-chance, .poor-visibility, .high-uv,
-                .high-pollution, .high-pollen {color: orange;}
-            .moderate-uv, .moderate-pollution, .moderate-pollen
-                {color: #c3eb34;}
-            .moderate-visibility, .good-visibility, .low-uv, .low-pollen,
-                .low-pollution {color: #00cc00;}
-            .very-good-visibility, .excellent-visibility {color: #0ca9f7;}
-
-            .yellow-warning {background: yellow;}
-            .amber-warning {background: orange;}
-            .red-warning {background: red;}
-            .yellow-warning, .amber-warning, .red-warning {
-                padding: 10px;
-                margin: 10px;
-            }
-
-            .major-info {font-size: 18px; white-space: pre-line;}
-            .minor-info {font-size: 12px; white-space: pre-line;}
-            """)
-    with document:
-        tags.h1(get_title(location_info))
-        tags.hr()
-
-        # Any warnings displayed.
-        warnings = data.get_future_warnings(location_id)
-        if warnings:
-            tags.h2("Warnings")
-            if len(warnings) == 1:
-                tags.p(f"There is currently 1 weather warning in place.")
-            else:
-                tags.p(
-                    f"There are currently {len(warnings)} "
-                    "weather warnings in place.")
-            for warning in warnings:
-                start = warning.start.strftime("%Y-%m-%d at %H:%M")
-                end = warning.end.strftime("%Y-%m-%d at %H:%M")
-                issued = warning.issued.strftime("%Y-%m-%d at %H:%M")
-                with tags.div(cls=WARNING_CLASSES[warning.level]):
-                    tags.h3(
-                        f"{warning.level} warning "
-                        f"for {warning.weather_type} "
-                        f"{'(ACTIVE)' if warning.active else ''}")
-                    tags.p(f"Start{'ed' if warning.active else 's'}: {start}")
-                    tags.p(f"Ends: {end}")
-                    with tags.p(__pretty=False):
-                        tags.em(warning.description)
-                    tags.p(f"Issued: {issued}")
-            tags.hr()
-
-        # Hourly forecast.
-        tags.h2("The next few hours...")
-        hourly_weather = data.get_future_weather(location_id, FUTURE_HOURS)
-        for weather_info in hourly_weather:
+    # Query all data relative to the same point in time.
+    now = time.time()
+    escape = html.escape
+    title = escape(get_title(location_info) if title is None else title)
+    # The report is built as a list of strings, joined at the end.
+    parts = [
+        "<!DOCTYPE html>\n<html>\n  <head>\n"
+        f"    <title>{title}</title>\n", EMAIL_HEAD_END,
+        f"  <body>\n    <h1>{title}</h1>\n    <hr>\n"]
+    add = parts.append
+
+    # Any warnings displayed.
+    warnings = data.get_future_warnings(location_id, now)
+    if warnings:
+        add("    <h2>Warnings</h2>\n")
+        if len(warnings) == 1:
+            add("    <p>There is currently 1 weather warning in place.</p>\n")
+        else:
+            add(
+                f"    <p>There are currently {len(warnings)} "
+                "weather warnings in place.</p>\n")
+        for warning in warnings:
+            add(WARNING_HTML.format(
+                warning_class=WARNING_CLASSES[warning.level],
+                level=warning.level,
+                weather_type=escape(warning.weather_type),
+                active="(ACTIVE)" if warning.active else "",
+                start_label="Started" if warning.active else "Starts",
+                start=_format_date_time(warning.start),
+                end=_format_date_time(warning.end),
+                description=escape(warning.description),
+                issued=_format_date_time(warning.issued)))
+        add("    <hr>\n")
+
+    # Hourly forecast.
+    add("    <h2>The next few hours...</h2>\n")
+    hourly_weather = data.get_future_weather(location_id, FUTURE_HOURS, now)
+    # Local names for the loop below.
+    format_hour = HOURLY_WEATHER_HTML.format
+    format_time = _format_time
+    temperature_class = get_temperature_class
+    precipitation_class = get_precipitation_class
+    visibility_classes = VISIBILITY_CLASSES
+    gusts_mph = get.GUSTS_MPH
+    for weather_info in hourly_weather:
+        wind_speed = f"{weather_info.wind_speed}mph "
+        if weather_info.wind_speed >= gusts_mph:
+            wind_speed = _span(wind_speed, "gusts")
+        add(format_hour(
             # Only show HH:MM, not HH:MM:SS
-            tags.h3(f"{weather_info.date_time.time().strftime('%H:%M')}")
-            temperature_class = get_temperature_class(weather_info.temperature)
-            feels_like_temperature_class = get_temperature_class(
-                weather_info.feels_like_temperature)
-            precipitation_class = get_precipitation_class(
-                weather_info.precipitation_odds)
-            visibility_class = VISIBILITY_CLASSES[weather_info.visibility]
-            with tags.p(__pretty=False):
-                with tags.span(cls="major-info"):
-                    text(f"Weather Type: {weather_info.weather_type}\n", False)
-                    text("Temperature: ", False)
-                    tags.span(
-                        f"{weather_info.temperature}°C", cls=temperature_class)
-                    text(" (feels like ", False)
-                    tags.span(
-                        f"{weather_info.feels_like_temperature}°C",
-                        cls=feels_like_temperature_class)
-                    text(")\n")
-                    text("Wind: ")
-                    if weather_info.wind_speed >= get.GUSTS_MPH:
-                        tags.span(
-                            f"{weather_info.wind_speed}mph ", cls="gusts")
-                    else:
-                        text(f"{weather_info.wind_speed}mph ")
-                    text(f"(from {weather_info.wind_direction})\n")
-                with tags.span(cls="minor-info"):
-                    text(f"Humidity: {weather_info.humidity}%\n")
-                    text("Precipitation odds: ")
-                    tags.span(
-                        f"{weather_info.precipitation_odds}%",
-                        cls=precipitation_class)
-                    text(f"\nPressure: {weather_info.pressure}mb")
-                    text("\nVisibility: ")
-                    tags.span(weather_info.visibility, cls=visibility_class)
-        tags.hr()
-
-        # Daily forecast.
-        tags.h2("The next few days...")
-        daily_conditions = data.get_future_conditions(location_id, FUTURE_DAYS)
-        for conditions in daily_conditions:
-            tags.h3(str(conditions.date))
-            max_temperature = conditions.max_temperature
-            min_temperature = conditions.min_temperature
-            sunrise = conditions.sunrise.strftime("%H:%M")
-            sunset = conditions.sunset.strftime("%H:%M")
-            max_temperature_class = get_temperature_class(max_temperature)
-            min_temperature_class = get_temperature_class(min_temperature)
-            uv_class = get_uv_class(conditions.uv)
-            with tags.p(__pretty=False).add(tags.div(cls="major-info")):
-                text("Max / Min temperature: ")
-                tags.span(f"{max_temperature}°C", cls=max_temperature_class)
-                text(" / ")
-                tags.span(f"{min_temperature}°C", cls=min_temperature_class)
-                text(f"\nSunrise / Sunset: {sunrise} / {sunset}")
-                text(f"\nUV Index: ")
-                tags.span(conditions.uv, cls=uv_class)
-                if conditions.pollution is not None:
-                    pollution_class = get_pollution_class(conditions.pollution)
-                    text(f"\nPollution Index: ")
-                    tags.span(conditions.pollution, cls=pollution_class)
-                if conditions.pollen is not None:
-                    pollen_class = get_pollen_class(conditions.pollen)
-                    text(f"\nPollen Index: ")
-                    tags.span(conditions.pollen, cls=pollen_class)
-        tags.hr()
-
-        # Footer information.
-        text(f"Data obtained at: {location_info.last_updated}")
-        url = f"{get.BBC_WEATHER_BASE_URL}/{location_id}"
-        with tags.p(__pretty=False):
-            text("Weather Page: ")
-            tags.a(url, href=url)
-
-    return document.render()
+            time=format_time(weather_info.date_time),
+            weather_type=escape(weather_info.weather_type),
+            temperature=weather_info.temperature,
+            temperature_class=temperature_class(weather_info.temperature),
+            feels_like_temperature=weather_info.feels_like_temperature,
+            feels_like_temperature_class=temperature_class(
+                weather_info.feels_like_temperature),
+            wind_speed=wind_speed,
+            wind_direction=escape(weather_info.wind_direction),
+            humidity=weather_info.humidity,
+            precipitation_odds=weather_info.precipitation_odds,
+            precipitation_class=precipitation_class(
+                weather_info.precipitation_odds),
+            pressure=weather_info.pressure,
+            visibility=weather_info.visibility,
+            visibility_class=visibility_classes[weather_info.visibility]))
+    add("    <hr>\n")
+
+    # Daily forecast.
+    add("    <h2>The next few days...</h2>\n")
+    daily_conditions = data.get_future_conditions(
+        location_id, FUTURE_DAYS, now)
+    for conditions in daily_conditions:
+        add(DAILY_CONDITIONS_HTML.format(
+            date=conditions.date,
+            max_temperature=conditions.max_temperature,
+            max_temperature_class=get_temperature_class(
+                conditions.max_temperature),
+            min_temperature=conditions.min_temperature,
+            min_temperature_class=get_temperature_class(
+                conditions.min_temperature),
+            sunrise=_format_time(conditions.sunrise),
+            sunset=_format_time(conditions.sunset),
+            uv=conditions.uv, uv_class=get_uv_class(conditions.uv)))
+        if conditions.pollution is not None:
+            pollution_class = get_pollution_class(conditions.pollution)
+            add(
+                "\nPollution Index: "
+                f"{_span(conditions.pollution, pollution_class)}")
+        if conditions.pollen is not None:
+            pollen_class = get_pollen_class(conditions.pollen)
+            add(f"\nPollen Index: {_span(conditions.pollen, pollen_class)}")
+        add("</div></p>\n")
+    add("    <hr>\n")
+
+    # Footer information.
+    url = escape(f"{get.BBC_WEATHER_BASE_URL}/{location_id}")
+    add(
+        f"    Data obtained at: {escape(str(location_info.last_updated))}\n"
+        f'    <p>Weather Page: <a href="{url}">{url}</a></p>\n'
+        "  </body>\n</html>")
+    return "".join(parts)
 
 
 def get_recipients_string(recipients: list[str]) -> str:
@@ -265,61 +326,169 @@ def get_recipients_string(recipients: list[str]) -> str:
     return f"{recipients[0]}, {recipients[1]} and {len(recipients) - 2} others"
 
 
-def send_email(email_info: data.EmailInfo, subject: str, body: str) -> None:
-    """Sends the weather report HTML email."""
+def create_report_part(body: str) -> MIMEText:
+    """
+    Returns the weather report HTML as an email part, which can be
+    shared by all the messages sending the same report.
+    """
+    # The report is not ASCII (°C), so skip straight to UTF-8.
+    return MIMEText(body, "html", "utf-8")
+
+
+def create_message(
+    email_info: data.EmailInfo, subject: str, report_part: MIMEText
+) -> bytes:
+    """Returns the weather report email message, serialised ready to send."""
     message = MIMEMultipart("alternative")
     message["Subject"] = subject
     message["From"] = email_info.sender
-    # To avoid unnecessary email address leakage, 
-    # recipients receive blind carbon copies.
-    message["Bcc"] = ", ".join(email_info.recipients)
-    message.attach(MIMEText(body, "html"))
-    # Attempts email sending multiple times before giving up.
-    attempts = MAX_EMAIL_SEND_ATTEMPTS
-    while True:
-        try:
-            with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as smtp:
-                smtp.ehlo()
-                smtp.starttls()
-                smtp.login(email_info.sender, email_info.password)
-                smtp.send_message(message)
-                return
-        except Exception as e:
-            attempts -= 1
-            if not attempts:
-                raise e
-            time.sleep(1)
+    # To avoid unnecessary email address leakage, recipients receive
+    # blind carbon copies - only given to the server, not in any header.
+    message.attach(report_part)
+    # Serialised once like smtplib would, rather than upon every attempt.
+    return message.as_bytes(policy=message.policy.clone(linesep="\r\n"))
+
+
+def _connect(sender: str, password: str) -> smtplib.SMTP:
+    # Returns an SMTP connection, logged in as the sender.
+    smtp = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
+    try:
+        smtp.ehlo()
+        smtp.starttls()
+        smtp.login(sender, password)
+    except Exception:
+        smtp.close()
+        raise
+    return smtp
+
+
+def _disconnect(smtp: smtplib.SMTP) -> None:
+    # Ends the SMTP session, closing the connection regardless.
+    try:
+        smtp.quit()
+    except smtplib.SMTPServerDisconnected:
+        pass
+    finally:
+        smtp.close()
+
+
+def send_messages(
+    sender: str, password: str, messages: list[tuple[list[str], bytes]]
+) -> None:
+    """
+    Sends serialised email messages, each with its recipients,
+    from a sender over a single connection.
+    """
+    smtp = None
+    try:
+        for recipients, message in messages:
+            # Attempts email sending multiple times before giving up.
+            attempts = MAX_EMAIL_SEND_ATTEMPTS
+            while True:
+                try:
+                    if smtp is None:
+                        smtp = _connect(sender, password)
+                    smtp.sendmail(sender, recipients, message)
+                    break
+                except Exception as e:
+                    attempts -= 1
+                    if not attempts:
+                        raise e
+                    # Only reconnect if the connection may be at fault,
+                    # not if the server simply rejected the message.
+                    if smtp is not None and not isinstance(
+                        e, MESSAGE_REJECTED_ERRORS
+                    ):
+                        smtp.close()
+                        smtp = None
+                    time.sleep(1)
+    finally:
+        if smtp is not None:
+            _disconnect(smtp)
+
+
+def _get_seconds_to_next_minute() -> float:
+    # Returns the number of seconds until the start of the next minute.
+    now = dt.datetime.now()
+    return 60 - now.second - now.microsecond / 1_000_000
 
 
 def main() -> None:
     """Main procedure of the script."""
     data.create_missing_tables()
     last_sent_time = None
-    while True:
-        current_date_time = dt.datetime.now()
-        # Extract current time in HH:MM.
-        current_time = current_date_time.time().replace(
-            second=0, microsecond=0)
-        # Critical - ensure only 1 email sent for a given time (HH:MM) to send.
-        if current_time == last_sent_time:
-            time.sleep(1)
-            continue
-        email_infos = data.get_email_infos()
-        start = timer()
-        for email_info in email_infos:
-            if current_time not in email_info.times:
+    # All send times of the email settings, only rebuilt when they change.
+    email_infos = None
+    send_times = frozenset()
+    # Senders' emails are sent concurrently, mostly waiting on the network.
+    with ThreadPoolExecutor(MAX_SEND_WORKERS) as executor:
+        while True:
+            current_date_time = dt.datetime.now()
+            # Extract current time in HH:MM.
+            current_time = current_date_time.time().replace(
+                second=0, microsecond=0)
+            # Critical - ensure only 1 email sent for a given time (HH:MM).
+            if current_time == last_sent_time:
+                time.sleep(_get_seconds_to_next_minute())
+                continue
+            # The settings are reused until the file is modified.
+            latest_email_infos = data.get_email_infos()
+            if latest_email_infos is not email_infos:
+                email_infos = latest_email_infos
+                send_times = frozenset(
+                    time_ for email_info in email_infos
+                    for time_ in email_info.times)
+            # Nothing to send at all this minute - wait for the next.
+            if current_time not in send_times:
+                time.sleep(_get_seconds_to_next_minute())
                 continue
-            location_info = data.get_location_info(email_info.location_id)
-            email_body = generate_html_email(
-                email_info.location_id, location_info)
-            send_email(email_info, get_title(location_info), email_body)
-            logging.info(
-                f"Successfully sent weather email from {email_info.sender} to "
-                f"{get_recipients_string(email_info.recipients)} at "
-                f"{current_date_time.strftime('%Y-%m-%d %H:%M')}")
-        stop = timer()
-        last_sent_time = current_time
-        time.sleep(max(0, REFRESH_SECONDS - (stop - start)))
+            due_email_infos = [
+                email_info for email_info in email_infos
+                if current_time in email_info.times]
+            # Information of all the locations to report on, in one query.
+            location_infos = data.get_location_infos(
+                {email_info.location_id for email_info in due_email_infos})
+            # Titles and reports already generated this minute, by location
+            # and data version. Not kept any longer since reports depend on
+            # the current time.
+            reports = {}
+            # Emails to send by sender, each sender using one connection.
+            sender_emails = {}
+            for email_info in due_email_infos:
+                location_info = location_infos[email_info.location_id]
+                key = (email_info.location_id, location_info.last_updated)
+                if key not in reports:
+                    title = get_title(location_info)
+                    reports[key] = (
+                        title,
+                        create_report_part(generate_html_email(
+                            email_info.location_id, location_info, title)))
+                title, report_part = reports[key]
+                message = create_message(email_info, title, report_part)
+                sender_emails.setdefault(
+                    (email_info.sender, email_info.password), []
+                ).append((email_info, message))
+            futures = [
+                (executor.submit(
+                    send_messages, sender, password,
+                    [(email_info.recipients, message)
+                        for email_info, message in emails]), sender, emails)
+                for (sender, password), emails in sender_emails.items()]
+            for future, sender, emails in futures:
+                # Waits for the sending, re-raising any error.
+                future.result()
+                for email_info, _ in emails:
+                    logging.info(
+                        f"Successfully sent weather email from {sender} to "
+                        f"{get_recipients_string(email_info.recipients)} at "
+                        f"{current_date_time.strftime('%Y-%m-%d %H:%M')}")
+            last_sent_time = current_time
+            # Emails can only be due from the start of the next minute,
+            # unless sending overran into it - then check it immediately.
+            if dt.datetime.now().time().replace(
+                second=0, microsecond=0
+            ) == current_time:
+                time.sleep(_get_seconds_to_next_minute())
 
 
 if __name__ == "__main__":